@@ -6,10 +6,12 @@ import time
 from bin import BINImage  # Import your new BIN decoder
 from lib.safe_iter_stream import SafeIterStream
 from lib.iter_stream import IterStream
+from lib.link_stats import LinkStats
+from lib.link_health import LinkHealth
 import io
 import gc
 import os
-from lib.utils import get_url, make_requests_session, check_wifi, collect, cleanup_session, is_dev
+from lib.utils import get_url, make_requests_session, collect, cleanup_session, is_dev
 from lib.time import set_rtc, get_rtc, get_server_time
 import microcontroller
 
@@ -31,6 +33,16 @@ microcontroller.cpus[1].frequency = 200000000
 MAX_IN_MEMORY_GIF = 10 * 1024  # 30 KB
 FORCE_STREAMING = True  # Force streaming even for images that fit in memory
 
+# What BINImage can actually decode. The server picks a variant within these
+# (and within matr-max-fps) and tells us which one in matr-variant.
+SUPPORTED_VARIANT = {
+    "enc": ("key",),  # full keyframes only, no delta frames yet
+    "bpp": ("8",),  # 256-color palette
+}
+
+LINK_STATS = LinkStats()
+LINK_HEALTH = LinkHealth()
+
 # --- Display setup ---
 
 bit_depth_value = 6  # Max for RGBMatrix
@@ -66,7 +78,8 @@ def play_next_frame(bin_image):
     w.feed()
     global total_overhead, frame_count
 
-    start = time.monotonic()
+    start = time.monotonic_ns()
+    net_start = LINK_STATS.net_ns
 
     result = bin_image.read_next_frame()
 
@@ -75,9 +88,12 @@ def play_next_frame(bin_image):
 
     frame, delay = result
 
-    overhead = time.monotonic() - start
+    overhead_ns = time.monotonic_ns() - start
+    overhead = overhead_ns / 1000000000
     total_overhead += overhead
     frame_count += 1
+    # Only count the decode, not time spent waiting on the network
+    LINK_STATS.add_frame(overhead_ns - (LINK_STATS.net_ns - net_start))
 
     if frame_count % 20 == 0 or delay > 1000:
         if delay > 500:
@@ -85,7 +101,10 @@ def play_next_frame(bin_image):
             collect()
         average_overhead = total_overhead / frame_count
         print("DelayMS:", delay,
-              "AverageOverheadMS:", average_overhead * 1000)
+              "AverageOverheadMS:", average_overhead * 1000,
+              "ThroughputBps:", int(LINK_STATS.throughput()),
+              "MinThroughputBps:", int(LINK_STATS.throughput_min()),
+              "MaxFPS:", LINK_STATS.max_fps())
 
     actualDelay = (delay / 1000) - overhead
 
@@ -119,6 +138,25 @@ def chain(first, second):
     for item in second:
         yield item
 
+class UnsupportedVariant(ValueError):
+    pass
+
+def parse_variant(value):
+    # "fps=8;bpp=8;enc=key" -> {"fps": "8", "bpp": "8", "enc": "key"}
+    variant = {}
+    if not value:
+        return variant
+    for part in value.split(";"):
+        if "=" in part:
+            k, v = part.split("=", 1)
+            variant[k.strip()] = v.strip()
+    return variant
+
+def check_variant(variant):
+    for key, allowed in SUPPORTED_VARIANT.items():
+        if key in variant and variant[key] not in allowed:
+            raise UnsupportedVariant(f"Unsupported variant {key}={variant[key]}")
+
 def fetch_bin_stream(url, retries=3):
     for attempt in range(retries):
         session = None
@@ -132,23 +170,38 @@ def fetch_bin_stream(url, retries=3):
                 "matr-time": str(time.mktime(get_rtc())),
                 "matr-id": os.getenv("ID"),
                 "matr-location": os.getenv("LOCATION"),
+                "matr-accept-enc": ",".join(SUPPORTED_VARIANT["enc"]),
+                "matr-accept-bpp": ",".join(SUPPORTED_VARIANT["bpp"]),
             }
+            headers.update(LINK_STATS.headers())
 
-            response = session.request(
-                method="GET",
-                headers=headers,
-                url=url,
-                stream=True)
+            try:
+                response = session.request(
+                    method="GET",
+                    headers=headers,
+                    url=url,
+                    stream=True)
+            except Exception:
+                # Couldn't reach the server at all. Bad status or format
+                # errors below are the server's problem, not the link's
+                LINK_HEALTH.add_failure()
+                raise
 
             if response.status_code != 200:
                 raise ValueError(f"Bad status: {response.status_code}")
 
+            # Older servers don't send this and always send the default variant
+            variant = parse_variant(response.headers.get("matr-variant"))
+            if variant:
+                print("Server variant:", variant)
+                check_variant(variant)
+
             chunk_iter = response.iter_content(2050)  # 2-byte delay + 64*32 pixels = one frame per chunk
 
             if FORCE_STREAMING:
                 # Skip buffering entirely — save up to MAX_IN_MEMORY_GIF bytes of RAM
                 collect()
-                return IterStream(SafeIterStream(chunk_iter)), response, session
+                return IterStream(SafeIterStream(chunk_iter, health=LINK_HEALTH), LINK_STATS, LINK_HEALTH), response, session
 
             data = bytearray()
             while len(data) < MAX_IN_MEMORY_GIF:
@@ -159,6 +212,9 @@ def fetch_bin_stream(url, retries=3):
                     data.extend(chunk)
                 except StopIteration:
                     break
+                except OSError:
+                    LINK_HEALTH.add_failure()
+                    raise
 
             if len(data) < MAX_IN_MEMORY_GIF:
                 print(f"Loaded {len(data)} bytes into memory")
@@ -169,10 +225,15 @@ def fetch_bin_stream(url, retries=3):
             else:
                 print("Too big for memory, streaming. Bytes:", len(data))
                 # Pass data directly (not bytes(data)) to avoid a redundant copy
-                full_iter = SafeIterStream(chain([data], chunk_iter))
+                full_iter = SafeIterStream(chain([data], chunk_iter), health=LINK_HEALTH)
                 collect()
-                return IterStream(full_iter), response, session
+                return IterStream(full_iter, LINK_STATS, LINK_HEALTH), response, session
 
+        except UnsupportedVariant as e:
+            # Asking again gets the same answer, give up on this asset
+            print(f"Fetch error: {e}")
+            cleanup_session(response, session)
+            raise RuntimeError("Server sent a variant we can't play")
         except Exception as e:
             print(f"Fetch error: {e}")
             cleanup_session(response, session)
@@ -225,9 +286,9 @@ def start_loop():
         response = None
         session = None
         try:
-            # FIX 7: check wifi on every iteration so dropped connections are recovered
+            # Only pings/reconnects when streaming saw trouble, or every so often
             try:
-                check_wifi()
+                LINK_HEALTH.check()
             except Exception as e:
                 print("WiFi check failed:", e)
 
@@ -1,17 +1,40 @@
 import gc
+import time
 
 class IterStream:
-    def __init__(self,iterable):
+    def __init__(self,iterable, stats=None, health=None):
         self._iter = iterable
         self._left = b''
         self._l_buffer = []
+        self._stats = stats
+        self._health = health
+        self._first = True  # first chunk waits on the server, not the link
+        if stats:
+            stats.start_stream()
+
+    def _next_chunk(self):
+        # Time each pull from the network, LinkStats wants it for throughput
+        # and LinkHealth for stalls
+        if self._stats is None and self._health is None:
+            return next(self._iter)
+        start = time.monotonic_ns()
+        chunk = next(self._iter)
+        end = time.monotonic_ns()
+        elapsed = end - start
+        if self._stats:
+            self._stats.add_chunk(len(chunk), elapsed, end)
+        if self._health and not self._first:
+            self._health.add_gap(elapsed)
+        self._first = False
+        return chunk
+
     def readable(self):
         return True
 
     def read1(self, n=None):
         while not self._left:
             try:
-                self._left = next(self._iter)
+                self._left = self._next_chunk()
             except StopIteration:
                 break
         ret = self._left[:n]
@@ -21,7 +44,7 @@ class IterStream:
     def prefetch(self, n_bytes):
         while len(self._left) < n_bytes:
             try:
-                self._left = self._left + next(self._iter)
+                self._left = self._left + self._next_chunk()
             except StopIteration:
                 break
 
@@ -0,0 +1,75 @@
+import time
+from lib.utils import check_wifi, reconnect_wifi
+
+STALL_GAP = 1000000000  # ns between chunks before we call it a stall
+MIN_PING_INTERVAL = 30  # seconds, used right after the link looked bad
+MAX_PING_INTERVAL = 600  # seconds, ceiling once it's been healthy for a while
+
+class LinkHealth:
+    """Decides when the WiFi link needs attention, from what streaming already sees.
+
+    IterStream reports chunk gaps, SafeIterStream retries and failed reads,
+    fetch_bin_stream failures to reach the server. check() runs once per
+    asset and only pings the gateway when those look off (or it's been a
+    long time), instead of every iteration.
+    """
+    def __init__(self):
+        self.stalls = 0
+        self.retries = 0
+        self.failures = 0
+        self.ping_interval = MIN_PING_INTERVAL
+        self.next_ping = time.monotonic() + self.ping_interval
+
+    def add_gap(self, elapsed_ns):
+        if elapsed_ns > STALL_GAP:
+            print("[link] Stall, waited", elapsed_ns / 1000000000, "s for a chunk")
+            self.stalls += 1
+
+    def add_retry(self):
+        self.retries += 1
+
+    def add_failure(self):
+        self.failures += 1
+
+    def _reset(self):
+        self.stalls = 0
+        self.retries = 0
+        self.failures = 0
+
+    def _healthy(self):
+        self.ping_interval = min(self.ping_interval * 2, MAX_PING_INTERVAL)
+        self.next_ping = time.monotonic() + self.ping_interval
+
+    def _degraded(self):
+        self.ping_interval = MIN_PING_INTERVAL
+        self.next_ping = time.monotonic() + self.ping_interval
+
+    def check(self):
+        stalls, retries, failures = self.stalls, self.retries, self.failures
+        self._reset()
+
+        # A failed fetch plus stalls/retries means the link is gone, don't
+        # bother asking the gateway. Failed fetches on their own could just
+        # be the server being down, those fall through to a ping below
+        if failures and (stalls or retries):
+            print("[link] Fetch failing, stalls:", stalls, "retries:", retries,
+                  "failures:", failures)
+            reconnect_wifi()
+            self._degraded()
+            return
+
+        if stalls or retries or failures:
+            print("[link] Degraded, stalls:", stalls, "retries:", retries,
+                  "failures:", failures)
+            check_wifi()
+            self._degraded()
+            return
+
+        if time.monotonic() < self.next_ping:
+            return
+
+        # Quiet for a while, make sure it's still there
+        if check_wifi():
+            self._healthy()
+        else:
+            self._degraded()
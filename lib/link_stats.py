@@ -0,0 +1,87 @@
+FRAME_BYTES = 2050  # 2-byte delay + 64*32 pixels
+BUFFERED_NS = 3000000  # pulls quicker than this came out of the socket buffer
+MAX_SPAN_NS = 10000000000  # ignore gaps this long between pulls, we weren't streaming
+
+class LinkStats:
+    """Running estimates of link throughput and per-frame decode cost.
+
+    Throughput is decayed totals of bytes over time spent waiting, counting
+    only pulls that actually waited on the network. Anything quicker was
+    already buffered and only measures how fast we copy. If playback never
+    has to wait, all we know is the link kept up, so we report the rate we
+    were fed at as a lower bound instead. Decode is exponentially weighted.
+    Times are in ns, monotonic() floats get too coarse for a single chunk
+    once the clock has been up a few days.
+    """
+    def __init__(self, alpha=0.2, decay=0.95):
+        self.alpha = alpha
+        self.decay = decay
+        self.bytes = 0  # decayed bytes from pulls that waited on the link
+        self.wait_ns = 0  # decayed time spent waiting for them
+        self.fed_bytes = 0  # decayed bytes from every pull
+        self.fed_ns = 0  # decayed wall time they were spread over
+        self.last_ns = 0  # end of the previous pull, 0 at the start of a stream
+        self.decode_ns = 0  # per frame, 0 until we've played a frame
+        self.net_ns = 0  # total time spent waiting on chunks, never decayed
+
+    def start_stream(self):
+        # The gap before the first chunk is the fetch, not playback
+        self.last_ns = 0
+
+    def add_chunk(self, n_bytes, elapsed_ns, end_ns):
+        self.net_ns += elapsed_ns
+        if elapsed_ns >= BUFFERED_NS:
+            self.bytes = self.bytes * self.decay + n_bytes
+            self.wait_ns = self.wait_ns * self.decay + elapsed_ns
+        if self.last_ns and end_ns - self.last_ns < MAX_SPAN_NS:
+            self.fed_bytes = self.fed_bytes * self.decay + n_bytes
+            self.fed_ns = self.fed_ns * self.decay + (end_ns - self.last_ns)
+        self.last_ns = end_ns
+
+    def add_frame(self, overhead_ns):
+        if overhead_ns <= 0:
+            return
+        if self.decode_ns == 0:
+            self.decode_ns = overhead_ns
+        else:
+            self.decode_ns += self.alpha * (overhead_ns - self.decode_ns)
+
+    def throughput(self):
+        # bytes/sec the link can do, 0 until a pull has actually waited on it
+        if self.wait_ns <= 0:
+            return 0
+        return self.bytes * 1000000000 / self.wait_ns
+
+    def throughput_min(self):
+        # bytes/sec we were fed at, the link can do at least this much
+        if self.fed_ns <= 0:
+            return 0
+        return self.fed_bytes * 1000000000 / self.fed_ns
+
+    def max_fps(self):
+        # Whichever runs out first, the network or the decoder
+        limits = []
+        throughput = self.throughput()
+        if throughput:
+            limits.append(throughput / FRAME_BYTES)
+        if self.decode_ns:
+            limits.append(1000000000 / self.decode_ns)
+        if not limits:
+            return 0
+        return min(limits)
+
+    def headers(self):
+        # Leave out anything we haven't measured yet, 0 would read as "free"
+        headers = {}
+        throughput = self.throughput()
+        if throughput:
+            headers["matr-throughput"] = str(int(throughput))
+        else:
+            throughput_min = self.throughput_min()
+            if throughput_min:
+                headers["matr-throughput-min"] = str(int(throughput_min))
+        if self.decode_ns:
+            headers["matr-decode-ms"] = str(int(self.decode_ns / 1000000))
+        if "matr-throughput" in headers or "matr-decode-ms" in headers:
+            headers["matr-max-fps"] = str(round(self.max_fps(), 1))
+        return headers
@@ -2,10 +2,11 @@ import time
 import errno
 
 class SafeIterStream:
-    def __init__(self, iterator, retries=3, delay=0.1):
+    def __init__(self, iterator, retries=3, delay=0.1, health=None):
         self.iterator = iterator
         self.retries = retries
         self.delay = delay
+        self.health = health
 
     def __iter__(self):
         return self
@@ -17,10 +18,16 @@ class SafeIterStream:
             except OSError as e:
                 if getattr(e, "errno", None) == errno.EBADF:
                     print(f"[retry] EBADF (bad file descriptor), retrying {attempt + 1}")
+                    if self.health:
+                        self.health.add_retry()
                     time.sleep(self.delay)
                 else:
+                    if self.health:
+                        self.health.add_failure()
                     raise
             except StopIteration:
                 raise
         print("[fail] Giving up after retries")
+        if self.health:
+            self.health.add_failure()
         raise StopIteration()
@@ -36,21 +36,34 @@ def cleanup_session(response, session):
     collect()
     time.sleep(0.01)
 
+def reconnect_wifi():
+    try:
+        print("Reconnecting to WiFi...")
+        wifi.radio.connect(WIFI_SSID, WIFI_PASSWORD)
+        print("Reconnected to WiFi")
+    except Exception as e:
+        print("Error reconnecting WiFi:", e)
+
 def check_wifi():
+    """Ping the gateway, reconnect if it's slow. Returns True if the link looked good."""
     try:
         print("Checking WiFi connection...")
         gateway = wifi.radio.ipv4_gateway
         rtt = wifi.radio.ping(gateway, timeout=1)
-        if rtt > 1:
+        # ping() returns None on timeout
+        if rtt is None or rtt > 1:
             print("WiFi connection poor, trying to reconnect...")
-            wifi.radio.connect(WIFI_SSID, WIFI_PASSWORD)
-            print("Reconnected to WiFi")
+            reconnect_wifi()
+            return False
         else:
             print("WiFi connection is good")
             print("RTT:", rtt, "s")
+            return True
     except Exception as e:
         print("Error checking WiFi:", e)
         print("Not taking action")
+        # Usually means the radio is down (no gateway), don't let it count as healthy
+        return False
 
 def get_url():
     if supervisor.runtime.usb_connected: